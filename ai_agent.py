@@ -8,15 +8,23 @@ This is a fully agentic AI system that uses LLM for:
 - Response generation
 """
 
+import asyncio
+import hashlib
 import json
 import re
 import os
-import sys
+import threading
 import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+import diskcache
 import psycopg2
-import psycopg2.errors
-from typing import Optional, List, Dict, Any, Tuple, Union
-from dataclasses import dataclass, field
+import psycopg2.pool
+from psycopg2.extras import execute_values
+from contextlib import contextmanager
+from typing import Optional, List, Dict, Any, AsyncIterator, Iterator, Mapping, Tuple, Union
 import logging
 import ollama
 
@@ -34,12 +42,46 @@ handler = logging.StreamHandler()
 handler.setFormatter(ColoredFormatter('%(asctime)s - %(message)s'))
 logger = logging.getLogger(__name__)
 logger.handlers = [handler]
-logger.setLevel(logging.INFO)
+logger.setLevel(logging.INFO)  # run with --debug for the step-by-step trace
+_RULE = "─" * 60  # separates the debug trace of consecutive turns
 
 # Constants
 KM_TO_MILES = 0.621371
 SQM_TO_SQFT = 10.7639
 MILES_TO_METERS = 1609.344
+RESPONSE_CACHE_TTL = 3600  # seconds an LLM response stays cached
+RESPONSE_CACHE_SIZE = 256  # entries kept by the in-memory cache
+# On-disk cache location used by the CLI, next to this file rather than the CWD
+DEFAULT_RESPONSE_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".agent_cache")
+CACHEABLE_MAX_TEMPERATURE = 0.2  # higher temperatures are meant to vary - never cache them
+SCHOOL_CACHE_TTL = 300.0  # seconds; schools change rarely
+SCHOOL_CACHE_SIZE = 128  # resolved school names kept in memory
+TRGM_SIMILARITY_THRESHOLD = 0.2  # pg_trgm `%` operator cutoff, set per connection
+POOL_CHECK_IDLE_SECONDS = 30.0  # pooled connections idle longer are pinged before reuse
+HISTORY_COMPACT_CHARS = 8000  # compact conversation history beyond this size
+HISTORY_KEEP_RECENT = 4  # most recent messages always kept verbatim
+HISTORY_COMPACT_MIN_CHARS = 2000  # old turns needed before another summary call
+HISTORY_MESSAGE_MAX_CHARS = 1200  # kept messages longer than this are truncated
+HISTORY_SUMMARY_MAX_CHARS = 1500  # oldest summary blocks are dropped beyond this
+HISTORY_SUMMARY_INPUT_CHARS = 8000  # ~2K tokens, leaves room in LLM_NUM_CTX
+SUMMARY_PREFIX = "[Prior summary]\n"
+
+# Generation ceilings for the main model. The agent mostly emits short tool
+# calls; long property lists are formatted in Python, never by the LLM.
+# num_ctx 4096 fits the stable prefix (system prompt + tools, ~1.1K tokens),
+# history capped by compaction (~2K tokens) and a full num_predict reply.
+# Every call to the same model must use the same num_ctx, otherwise Ollama
+# reloads the model. A smaller context also shrinks the per-request KV cache,
+# leaving room for a higher OLLAMA_NUM_PARALLEL.
+LLM_NUM_CTX = 4096
+LLM_OPTIONS: Mapping[str, Any] = MappingProxyType(
+    {"temperature": 0.1, "top_p": 0.9, "num_predict": 512, "num_ctx": LLM_NUM_CTX})
+
+# Fast-path slot extraction for unambiguous numeric input ("1000-3000 sqft", "2 km")
+_RANGE_RE = re.compile(r'(\d[\d,]*)\s*(?:-|to)\s*(\d[\d,]*)\s*(?:sq\.?\s*ft|square\s+feet)', re.I)
+_RADIUS_RE = re.compile(r'(\d+(?:\.\d+)?)\s*(mi|miles?|km|kilometers?|kilometres?)\b', re.I)
+# search_properties arguments that answer each ask_clarification missing_field
+_CLARIFICATION_SLOTS = {"radius": ("radius_miles",), "area": ("area_min_sqft", "area_max_sqft")}
 
 # Tool definitions for the agent
 TOOLS = [
@@ -174,6 +216,122 @@ UNIT HANDLING:
 - Radius: "miles" or number = use as-is | "km" = multiply by 0.621371
 - Area: "sqft" = use as-is | "sqm" = multiply by 10.7639"""
 
+# Stable prompt prefix: tools + system prompt are canonicalized once so every
+# request starts with byte-identical tokens and Ollama can reuse the prefix KV
+# cache. Only append-only conversation turns follow it - never put timestamps
+# or other per-call data into the messages.
+_SERIALIZED_TOOLS = json.dumps(TOOLS, sort_keys=True)
+# Pre-validated ollama.Tool models are passed through by the client as-is,
+# so the ~2KB schema is not re-validated on every turn.
+_STABLE_TOOLS = tuple(ollama.Tool.model_validate(t) for t in json.loads(_SERIALIZED_TOOLS))
+_SYSTEM_MSG: Mapping[str, str] = MappingProxyType({"role": "system", "content": SYSTEM_PROMPT})
+
+# Two-tier routing: a small model only decides whether the latest message is a
+# new search that still lacks a required field. It sees just ask_clarification
+# and its reply is capped at a few tokens.
+ROUTER_PROMPT = """You check property search requests for missing information.
+
+A NEW search needs ALL of: school_name, radius (miles or km), area range (min and max sqft or sqm).
+Values may appear in any earlier user message since the search was started.
+
+- If the latest user message starts or continues a NEW search and a field is missing,
+  call ask_clarification for the FIRST missing field in this order: school_name, radius, area.
+- Follow-up questions about previous results, greetings, questions about available schools or
+  locations, and complete search requests are NOT missing anything: reply with just OK."""
+
+# Tools whose pre-formatted result IS the reply. Their output never goes back
+# to the LLM for rephrasing, which would cost a whole extra round-trip.
+_DETERMINISTIC_TOOLS = frozenset({"list_schools", "geocode_location", "ask_clarification"})
+
+_ROUTER_MSG: Mapping[str, str] = MappingProxyType({"role": "system", "content": ROUTER_PROMPT})
+_ROUTER_TOOLS = tuple(t for t in _STABLE_TOOLS if t.function.name == "ask_clarification")
+_SERIALIZED_ROUTER_TOOLS = json.dumps([t.model_dump(exclude_none=True) for t in _ROUTER_TOOLS], sort_keys=True)
+_ROUTER_OPTIONS: Mapping[str, Any] = MappingProxyType(
+    {"temperature": 0.1, "num_predict": 64, "num_ctx": LLM_NUM_CTX})
+
+
+# Radius search, prepared once per pooled connection so repeated searches skip
+# parse/plan. Args: lon, lat, meters per mile, radius in meters, area min/max
+# (either area bound NULL disables the area filter). geom is already
+# GEOGRAPHY(POINT, 4326), so it is used uncast; a bare ST_MakePoint cast to
+# geography defaults to SRID 4326. The center point is a constant expression,
+# so ORDER BY <-> walks the GIST index nearest-first instead of sorting every
+# match by a second ST_Distance evaluation. The area bounds are numeric to
+# match area_sqft DECIMAL(10,2); float8 bounds would cast the column on every
+# row and rule out idx_parcels_area.
+_PREPARE_SEARCH_PARCELS = """
+    PREPARE search_parcels (float8, float8, float8, float8, numeric, numeric) AS
+    SELECT parcel_id, address, area_sqft, property_type,
+           ST_Distance(geom, ST_MakePoint($1, $2)::geography) / $3 as distance_miles
+    FROM parcels
+    WHERE ST_DWithin(geom, ST_MakePoint($1, $2)::geography, $4)
+      AND ($5 IS NULL OR $6 IS NULL OR area_sqft BETWEEN $5 AND $6)
+    ORDER BY geom <-> ST_MakePoint($1, $2)::geography
+"""
+
+
+class _MemoryResponseCache:
+    """In-process LRU with per-entry expiry; the subset of diskcache.Cache the agent uses."""
+    
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE) -> None:
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+    
+    def get(self, key: str) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+    
+    def set(self, key: str, value: Any, expire: float) -> None:
+        self._entries[key] = (time.monotonic() + expire, value)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        self._entries.clear()
+    
+    def close(self) -> None:
+        pass
+
+
+class DatabaseConnectionError(ConnectionError):
+    """The database could not provide a connection after all retries.
+    
+    A subclass of ConnectionError, so it can be told apart from the
+    ConnectionError the Ollama client raises when the server is down.
+    """
+
+
+class _PooledConnection(psycopg2.extensions.connection):
+    """psycopg2 connection that remembers session setup and when it was last used."""
+    initialized: bool = False
+    last_used: float = 0.0  # time.monotonic() when it was last returned to the pool
+
+
+class Conversation:
+    """Per-user chat state.
+    
+    An agent holds the shared resources (connection pool, response cache,
+    Ollama clients); conversations only hold what differs between users, so
+    one agent can serve many of them concurrently.
+    
+    Attributes:
+        history: Messages exchanged so far, oldest first
+    """
+    
+    def __init__(self) -> None:
+        self.history: List[Dict[str, str]] = []
+    
+    def reset(self) -> None:
+        """Forget all earlier turns."""
+        self.history = []
+
 
 class AIPropertyAgent:
     """AI-powered property search agent using Ollama.
@@ -181,59 +339,221 @@ class AIPropertyAgent:
     Attributes:
         db_config: Database connection configuration
         model: Ollama model name (default: qwen2.5:7b)
+        router_model: Small Ollama model that handles clarification turns,
+            or None to send every turn to ``model``. Every other turn then
+            costs one extra, sequential router call, and Ollama must keep
+            both models loaded (OLLAMA_MAX_LOADED_MODELS >= 2)
+        response_cache_dir: Directory of the on-disk LLM response cache,
+            shared by every agent and process that points at it. None
+            (default) keeps responses in memory only, so nothing the user
+            typed is written to disk.
+        enable_narrative: Append an LLM-written summary after search results
+            (costs a second LLM call per search; off by default)
+        ollama_host: Ollama server URL (default: OLLAMA_HOST env or localhost)
+        conversation: Conversation used when a call does not pass its own
         max_retries: Maximum connection retry attempts
+        min_connections: Connections opened eagerly when the pool is created
+        max_connections: Upper bound on concurrently borrowed connections
     """
     
-    def __init__(self, db_config: Dict[str, Any], model: str = "qwen2.5:7b") -> None:
+    def __init__(self, db_config: Dict[str, Any], model: str = "qwen2.5:7b",
+                 ollama_host: Optional[str] = None,
+                 router_model: Optional[str] = "qwen2.5:0.5b-instruct-q4_0",
+                 response_cache_dir: Optional[str] = None) -> None:
         self.db_config: Dict[str, Any] = db_config
         self.model: str = model
-        self._conn: Optional[psycopg2.extensions.connection] = None
-        self.conversation_history: List[Dict[str, str]] = []
+        self.router_model: Optional[str] = router_model
+        self.enable_narrative: bool = False
+        self.ollama_host: Optional[str] = ollama_host
+        # httpx connections are bound to the loop that opened them, so every
+        # event loop driving this agent gets its own client
+        self._aclients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, ollama.AsyncClient]" = (
+            weakref.WeakKeyDictionary())
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pool: Optional[psycopg2.pool.ThreadedConnectionPool] = None
+        self._pool_lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None  # tool threads, one per pooled connection
+        self.conversation: Conversation = Conversation()
+        self._response_cache: Union[diskcache.Cache, _MemoryResponseCache] = (
+            diskcache.Cache(response_cache_dir) if response_cache_dir else _MemoryResponseCache())
+        self._schools_cache: Optional[Tuple[float, List[str]]] = None
+        self._resolve_cache: "OrderedDict[str, Tuple[float, Optional[Dict[str, Union[str, float]]]]]" = OrderedDict()
+        self._resolve_lock = threading.Lock()  # tools resolve schools from several threads
+        self._school_index: Dict[str, Tuple[str, float, float]] = {}  # normalized name -> (name, lat, lon)
+        self._school_index_loaded: Optional[float] = None
         self.max_retries: int = 3
         self.retry_delay: float = 1.0  # seconds
-        
+        self.min_connections: int = 2
+        self.max_connections: int = 10
+    
     @property
-    def conn(self) -> psycopg2.extensions.connection:
-        """Get database connection with automatic retry on failure."""
-        if self._conn is None or self._conn.closed:
-            self._conn = self._connect_with_retry()
-        return self._conn
+    def conversation_history(self) -> List[Dict[str, str]]:
+        """History of the default conversation."""
+        return self.conversation.history
+    
+    @conversation_history.setter
+    def conversation_history(self, history: List[Dict[str, str]]) -> None:
+        self.conversation.history = history
+    
+    def _client(self) -> ollama.AsyncClient:
+        """Get the Ollama client for the running event loop, creating it on first use."""
+        loop = asyncio.get_running_loop()
+        client = self._aclients.get(loop)
+        if client is None:
+            client = self._aclients[loop] = ollama.AsyncClient(host=self.ollama_host)
+        return client
+        
+    @contextmanager
+    def _get_conn(self) -> Iterator[psycopg2.extensions.connection]:
+        """Borrow a pooled database connection for the duration of a block."""
+        conn = self._connect_with_retry()
+        try:
+            yield conn
+        finally:
+            if self._pool is not None and not self._pool.closed:
+                conn.last_used = time.monotonic()
+                self._pool.putconn(conn, close=bool(conn.closed))
+    
+    @staticmethod
+    def _is_alive(conn: _PooledConnection) -> bool:
+        """Ping a connection; psycopg2 only notices a dropped one when a query fails."""
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            return True
+        except psycopg2.Error:
+            return False
+    
+    def _checkout(self) -> _PooledConnection:
+        """Take a live connection from the pool, replacing ones the server dropped.
+        
+        Only connections idle for over POOL_CHECK_IDLE_SECONDS are pinged, so
+        busy sessions pay no extra round-trip. After a database restart every
+        pooled connection may be stale, hence the loop.
+        """
+        for _ in range(self.max_connections + 1):
+            conn = self._pool.getconn()
+            if not conn.closed and (not conn.initialized
+                                    or time.monotonic() - conn.last_used < POOL_CHECK_IDLE_SECONDS
+                                    or self._is_alive(conn)):
+                return conn
+            logger.debug("   └─ Discarding dropped database connection")
+            self._pool.putconn(conn, close=True)
+        raise psycopg2.OperationalError("no live connection in the pool")
     
     def _connect_with_retry(self) -> psycopg2.extensions.connection:
-        """Establish database connection with exponential backoff retry."""
+        """Take a connection from the pool with exponential backoff retry.
+        
+        The pool is created lazily on first use. Connections that the server
+        dropped while idle are detected on checkout and replaced. If every
+        pooled connection is borrowed, the call backs off and tries again.
+        """
         last_error: Optional[Exception] = None
         
         for attempt in range(1, self.max_retries + 1):
             try:
-                conn = psycopg2.connect(**self.db_config)
-                conn.autocommit = True
+                with self._pool_lock:
+                    if self._pool is None or self._pool.closed:
+                        self._pool = psycopg2.pool.ThreadedConnectionPool(
+                            self.min_connections, self.max_connections,
+                            connection_factory=_PooledConnection, **self.db_config)
+                conn = self._checkout()
+                if not conn.initialized:
+                    try:
+                        self._init_connection(conn)
+                    except Exception:
+                        # Never leak the slot: a half-initialized connection is discarded
+                        self._pool.putconn(conn, close=True)
+                        raise
                 return conn
-            except psycopg2.OperationalError as e:
+            except (psycopg2.OperationalError, psycopg2.pool.PoolError) as e:
                 last_error = e
                 if attempt < self.max_retries:
                     delay = self.retry_delay * (2 ** (attempt - 1))  # Exponential backoff
-                    print(f"⚠️  DB connection failed (attempt {attempt}/{self.max_retries}). Retrying in {delay:.1f}s...", flush=True)
+                    logger.warning("⚠️  DB connection failed (attempt %d/%d): %s. Retrying in %.1fs...",
+                                   attempt, self.max_retries, e, delay)
                     time.sleep(delay)
         
         # All retries failed
-        print(f"\n❌ Database connection failed after {self.max_retries} attempts.", flush=True)
-        print(f"   Error: {last_error}", flush=True)
-        print(f"\n💡 Make sure the database is running:", flush=True)
-        print(f"   docker-compose up -d\n", flush=True)
-        raise ConnectionError(f"Could not connect to database: {last_error}")
+        logger.error("❌ Database connection failed after %d attempts: %s", self.max_retries, last_error)
+        if isinstance(last_error, psycopg2.pool.PoolError):
+            logger.error("💡 All %d pooled connections are busy - raise max_connections", self.max_connections)
+        else:
+            logger.error("💡 Make sure the database is running: docker-compose up -d")
+        raise DatabaseConnectionError(f"Could not connect to database: {last_error}")
+    
+    def _init_connection(self, conn: _PooledConnection) -> None:
+        """Prepare a freshly opened pooled connection for the agent's queries."""
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            # Lets `name % query` use the trigram GIN index on schools.name
+            cursor.execute("SET pg_trgm.similarity_threshold = %s", (TRGM_SIMILARITY_THRESHOLD,))
+            cursor.execute(_PREPARE_SEARCH_PARCELS)
+        conn.initialized = True
     
     def close(self) -> None:
-        """Close database connection safely."""
-        if self._conn and not self._conn.closed:
-            self._conn.close()
-            self._conn = None
+        """Close pooled database connections and the sync-wrapper event loop safely."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self._pool is not None and not self._pool.closed:
+            self._pool.closeall()
+            self._pool = None
+        if self._loop is not None and not self._loop.is_closed():
+            client = self._aclients.pop(self._loop, None)
+            if client is not None:
+                # Shut down its httpx connection pool on the loop that owns it;
+                # the underlying client is there on every supported ollama version
+                self._loop.run_until_complete(client._client.aclose())
+            self._loop.close()
+            self._loop = None
+        self._response_cache.close()
             
     # =========================================================================
     # TOOL IMPLEMENTATIONS
     # =========================================================================
     
+    def _invalidate_school_cache(self) -> None:
+        """Forget cached school lists, name resolutions and the name index."""
+        self._schools_cache = None
+        with self._resolve_lock:
+            self._resolve_cache.clear()
+        self._school_index_loaded = None
+    
+    @staticmethod
+    def _normalize_name(name: str) -> str:
+        """Lowercase a school name and collapse its whitespace."""
+        return " ".join(name.lower().split())
+    
+    def _match_school_index(self, school_name: str) -> Optional[Dict[str, Union[str, float]]]:
+        """Serve substring matches from an in-memory index of all schools.
+        
+        The index is (re)loaded from the database at most once per
+        SCHOOL_CACHE_TTL. Among several matches the shortest name wins, as
+        it is the closest to what the user typed.
+        """
+        query = self._normalize_name(school_name)
+        if not query:
+            return None
+        
+        loaded = self._school_index_loaded
+        if loaded is None or time.monotonic() - loaded >= SCHOOL_CACHE_TTL:
+            with self._get_conn() as conn, conn.cursor() as cursor:
+                cursor.execute("SELECT name, ST_Y(geom::geometry), ST_X(geom::geometry) FROM schools")
+                self._school_index = {self._normalize_name(r[0]): (r[0], float(r[1]), float(r[2]))
+                                      for r in cursor.fetchall()}
+            self._school_index_loaded = time.monotonic()
+            logger.debug("    │  ├─ Loaded %d schools into the name index", len(self._school_index))
+        
+        matches = [entry for key, entry in self._school_index.items() if query in key]
+        if not matches:
+            return None
+        name, lat, lon = min(matches, key=lambda entry: len(entry[0]))
+        logger.debug("    │  └─ ✅ Index match: %s at (%.4f, %.4f)", name, lat, lon)
+        return {"name": name, "lat": lat, "lon": lon}
+    
     def _resolve_school(self, school_name: str) -> Optional[Dict[str, Union[str, float]]]:
-        """Find school by name with fuzzy matching.
+        """Find school by name with fuzzy matching, cached for SCHOOL_CACHE_TTL.
         
         Args:
             school_name: Name of school to search for
@@ -241,39 +561,52 @@ class AIPropertyAgent:
         Returns:
             Dict with 'name', 'lat', 'lon' keys if found, None otherwise
         """
-        print(f"    ├─ 🏫 CALL: _resolve_school('{school_name}')", flush=True)
-        cursor = self.conn.cursor()
-        try:
-            # Try exact match first
-            print(f"    │  ├─ Trying exact match...", flush=True)
-            cursor.execute("""
-                SELECT name, ST_Y(geom::geometry) as lat, ST_X(geom::geometry) as lon
-                FROM schools WHERE name ILIKE %s LIMIT 1
-            """, (f'%{school_name}%',))
-            
-            result = cursor.fetchone()
-            if result:
-                print(f"    │  └─ ✅ Exact match: {result[0]} at ({result[1]:.4f}, {result[2]:.4f})", flush=True)
-                return {"name": result[0], "lat": float(result[1]), "lon": float(result[2])}
-            
-            # Try fuzzy match
-            print(f"    │  ├─ No exact match, trying fuzzy...", flush=True)
+        logger.debug("    ├─ 🏫 CALL: _resolve_school(%r)", school_name)
+        key = self._normalize_name(school_name)
+        with self._resolve_lock:
+            cached = self._resolve_cache.get(key)
+        if cached is not None and time.monotonic() - cached[0] < SCHOOL_CACHE_TTL:
+            logger.debug("    │  └─ ⚡ Cache hit: %s", cached[1]["name"] if cached[1] else "no match")
+            return cached[1]
+        
+        school = self._match_school_index(school_name) or self._query_school(school_name)
+        with self._resolve_lock:
+            self._resolve_cache[key] = (time.monotonic(), school)
+            self._resolve_cache.move_to_end(key)
+            if len(self._resolve_cache) > SCHOOL_CACHE_SIZE:
+                self._resolve_cache.popitem(last=False)
+        return school
+    
+    def _query_school(self, school_name: str) -> Optional[Dict[str, Union[str, float]]]:
+        """Look up a school in the database in a single round-trip.
+        
+        Used when the in-memory index has no substring match, so in practice
+        this is the fuzzy (trigram) path.
+        
+        Substring (ILIKE) matches rank above trigram-similarity matches; ties
+        are broken by similarity. Both ILIKE and the `%` operator can use the
+        idx_schools_name_trgm GIN index, unlike a bare similarity() filter.
+        """
+        with self._get_conn() as conn, conn.cursor() as cursor:
+            logger.debug("    │  ├─ Trying exact + fuzzy match in one query...")
             cursor.execute("""
                 SELECT name, ST_Y(geom::geometry) as lat, ST_X(geom::geometry) as lon,
-                       similarity(name, %s) as sml
-                FROM schools WHERE similarity(name, %s) > 0.2
-                ORDER BY sml DESC LIMIT 1
-            """, (school_name, school_name))
+                       name ILIKE %(pattern)s as exact, similarity(name, %(name)s) as sml
+                FROM schools
+                WHERE name ILIKE %(pattern)s OR name %% %(name)s
+                ORDER BY exact DESC, sml DESC LIMIT 1
+            """, {"pattern": f'%{school_name}%', "name": school_name})
             
             result = cursor.fetchone()
+            if result and result[3]:
+                logger.debug("    │  └─ ✅ Exact match: %s at (%.4f, %.4f)", result[0], result[1], result[2])
+                return {"name": result[0], "lat": float(result[1]), "lon": float(result[2])}
             if result:
-                print(f"    │  └─ ✅ Fuzzy match: {result[0]} (confidence: {result[3]:.2f})", flush=True)
+                logger.debug("    │  └─ ✅ Fuzzy match: %s (confidence: %.2f)", result[0], result[4])
                 return {"name": result[0], "lat": float(result[1]), "lon": float(result[2]), 
-                        "confidence": float(result[3])}
-            print(f"    │  └─ ❌ No match found", flush=True)
+                        "confidence": float(result[4])}
+            logger.debug("    │  └─ ❌ No match found")
             return None
-        finally:
-            cursor.close()
     
     def _search_properties(self, lat: float, lon: float, radius_miles: float,
                           area_min: Optional[float] = None, 
@@ -290,41 +623,23 @@ class AIPropertyAgent:
         Returns:
             List of property dictionaries with address, area, distance
         """
-        print(f"    ├─ 🟢 CALL: _search_properties(lat={lat:.4f}, lon={lon:.4f}, radius={radius_miles:.2f}mi)", flush=True)
+        logger.debug("    ├─ 🟢 CALL: _search_properties(lat=%.4f, lon=%.4f, radius=%.2fmi)", lat, lon, radius_miles)
         if area_min and area_max:
-            print(f"    │     └─ area_filter: {area_min:.0f}-{area_max:.0f} sqft", flush=True)
+            logger.debug("    │     └─ area_filter: %.0f-%.0f sqft", area_min, area_max)
         
-        cursor = self.conn.cursor()
         radius_meters = radius_miles * MILES_TO_METERS
-        print(f"    │  ├─ Converting radius: {radius_miles:.2f} miles → {radius_meters:.0f} meters (for PostGIS)", flush=True)
+        logger.debug("    │  ├─ Converting radius: %.2f miles → %.0f meters (for PostGIS)", radius_miles, radius_meters)
         
-        try:
-            query = """
-                SELECT parcel_id, address, area_sqft, property_type,
-                       ST_Distance(geom::geography, 
-                           ST_SetSRID(ST_MakePoint(%s, %s), 4326)::geography
-                       ) / %s as distance_miles
-                FROM parcels
-                WHERE ST_DWithin(geom::geography,
-                    ST_SetSRID(ST_MakePoint(%s, %s), 4326)::geography, %s)
-            """
-            params = [lon, lat, MILES_TO_METERS, lon, lat, radius_meters]
-            
-            if area_min is not None and area_max is not None:
-                query += " AND area_sqft BETWEEN %s AND %s"
-                params.extend([area_min, area_max])
-            
-            query += " ORDER BY distance_miles"
-            print(f"    │  ├─ Executing PostGIS spatial query (ST_DWithin)...", flush=True)
-            cursor.execute(query, params)
+        with self._get_conn() as conn, conn.cursor() as cursor:
+            logger.debug("    │  ├─ Executing prepared PostGIS spatial query (ST_DWithin + KNN)...")
+            cursor.execute("EXECUTE search_parcels (%s, %s, %s, %s, %s, %s)",
+                           (lon, lat, MILES_TO_METERS, radius_meters, area_min, area_max))
             
             results = [{"parcel_id": r[0], "address": r[1], "area_sqft": float(r[2]),
                     "property_type": r[3], "distance_miles": round(float(r[4]), 2)}
                    for r in cursor.fetchall()]
-            print(f"    │  └─ ✅ Query returned {len(results)} properties", flush=True)
+            logger.debug("    │  └─ ✅ Query returned %d properties", len(results))
             return results
-        finally:
-            cursor.close()
     
     def _list_schools(self) -> List[str]:
         """Get all school names from the database.
@@ -332,16 +647,19 @@ class AIPropertyAgent:
         Returns:
             List of school names sorted alphabetically
         """
-        print(f"    ├─ 📚 CALL: _list_schools()", flush=True)
-        cursor = self.conn.cursor()
-        try:
-            print(f"    │  ├─ Querying schools table...", flush=True)
+        logger.debug("    ├─ 📚 CALL: _list_schools()")
+        cached = self._schools_cache
+        if cached is not None and time.monotonic() - cached[0] < SCHOOL_CACHE_TTL:
+            logger.debug("    │  └─ ⚡ Cache hit: %d schools", len(cached[1]))
+            return cached[1]
+        
+        with self._get_conn() as conn, conn.cursor() as cursor:
+            logger.debug("    │  ├─ Querying schools table...")
             cursor.execute("SELECT name FROM schools ORDER BY name")
             schools = [r[0] for r in cursor.fetchall()]
-            print(f"    │  └─ ✅ Found {len(schools)} schools: {schools}", flush=True)
-            return schools
-        finally:
-            cursor.close()
+            logger.debug("    │  └─ ✅ Found %d schools: %s", len(schools), schools)
+        self._schools_cache = (time.monotonic(), schools)
+        return schools
     
     def _geocode_location(self, location_name: str) -> Optional[Dict[str, Union[str, float]]]:
         """Get coordinates for a location by querying the database.
@@ -352,31 +670,80 @@ class AIPropertyAgent:
         Returns:
             Dict with 'name', 'lat', 'lon' if found, None otherwise
         """
-        print(f"    ├─ 🌍 CALL: _geocode_location('{location_name}')", flush=True)
-        cursor = self.conn.cursor()
-        try:
-            # Query schools table with fuzzy matching
-            print(f"    │  ├─ Executing SQL: SELECT with similarity matching...", flush=True)
+        logger.debug("    ├─ 🌍 CALL: _geocode_location(%r)", location_name)
+        with self._get_conn() as conn, conn.cursor() as cursor:
+            # Query schools table with fuzzy matching (`%` is index-assisted)
+            logger.debug("    │  ├─ Executing SQL: SELECT with similarity matching...")
             cursor.execute("""
                 SELECT name, 
                        ST_Y(geom::geometry) as lat, 
                        ST_X(geom::geometry) as lon,
-                       similarity(name, %s) as match_score
+                       similarity(name, %(name)s) as match_score
                 FROM schools 
-                WHERE similarity(name, %s) > 0.3
+                WHERE name %% %(name)s
                 ORDER BY match_score DESC 
                 LIMIT 1
-            """, (location_name, location_name))
+            """, {"name": location_name})
             
             result = cursor.fetchone()
             if result and result[3] >= 0.5:  # Require 50% match
-                print(f"    │  └─ ✅ Found: {result[0]} at ({result[1]:.4f}, {result[2]:.4f}) [match: {result[3]:.0%}]", flush=True)
+                logger.debug("    │  └─ ✅ Found: %s at (%.4f, %.4f) [match: %.0f%%]", result[0], result[1], result[2], result[3] * 100)
                 return {"name": result[0], "lat": round(float(result[1]), 6), "lon": round(float(result[2]), 6)}
             
-            print(f"    │  └─ ❌ No match found for '{location_name}'", flush=True)
+            logger.debug("    │  └─ ❌ No match found for %r", location_name)
             return None
-        finally:
-            cursor.close()
+    
+    # =========================================================================
+    # SLOT EXTRACTION
+    # =========================================================================
+    
+    @staticmethod
+    def _extract_slots(user_message: str) -> Dict[str, float]:
+        """Parse radius/area values stated explicitly in the user's text.
+        
+        The regexes only match unambiguous numeric input, so these values can
+        fill search_properties arguments the LLM left out instead of costing
+        another clarification round. Slots only live for the turn they were
+        parsed in; later turns rely on the conversation history.
+        
+        Returns:
+            Search argument names mapped to their values
+        """
+        slots: Dict[str, float] = {}
+        if m := _RANGE_RE.search(user_message):
+            low, high = sorted(float(g.replace(",", "")) for g in m.groups())
+            slots["area_min_sqft"], slots["area_max_sqft"] = low, high
+        if m := _RADIUS_RE.search(user_message):
+            radius = float(m.group(1))
+            if m.group(2).lower().startswith("k"):
+                radius *= KM_TO_MILES
+            slots["radius_miles"] = radius
+        if slots:
+            logger.debug("   └─ Slots from text: %s", slots)
+        return slots
+    
+    @staticmethod
+    def _slots_message(slots: Mapping[str, float]) -> List[Mapping[str, Any]]:
+        """Return a trailing hint telling the model which values are known.
+        
+        Appended after the history, so the cached prompt prefix is unchanged.
+        """
+        if not slots:
+            return []
+        known = ", ".join(f"{key}={value:g}" for key, value in slots.items())
+        return [{"role": "system",
+                 "content": f"Parsed from the user's last message: {known}. Do not ask for these again."}]
+    
+    @staticmethod
+    def _fill_slots(tool_name: str, args: Dict[str, Any], slots: Mapping[str, float]) -> Dict[str, Any]:
+        """Return search_properties args with missing fields taken from slots."""
+        if tool_name != "search_properties" or not slots:
+            return args
+        filled = dict(args)
+        for key, value in slots.items():
+            if filled.get(key) is None:
+                filled[key] = value
+        return filled
     
     # =========================================================================
     # TOOL EXECUTOR
@@ -415,133 +782,475 @@ class AIPropertyAgent:
                 for i, p in enumerate(properties, 1):
                     result += f"{i}. {p['address']} - {p['area_sqft']:,.0f} sq ft - {p['distance_miles']} miles away\n"
             
-            print(f"    └─ ✅ TOOL RESULT: Found {len(properties)} properties", flush=True)
+            logger.debug("    └─ ✅ TOOL RESULT: Found %d properties", len(properties))
             return result
         
         elif tool_name == "list_schools":
             schools = self._list_schools()
-            print(f"    └─ ✅ TOOL RESULT: Listed {len(schools)} schools", flush=True)
+            logger.debug("    └─ ✅ TOOL RESULT: Listed %d schools", len(schools))
             return f"📚 Available schools:\n" + "\n".join(f"• {s}" for s in schools)
         
         elif tool_name == "ask_clarification":
-            print(f"    └─ ❓ CLARIFICATION NEEDED: {args['missing_field']}", flush=True)
+            logger.debug("    └─ ❓ CLARIFICATION NEEDED: %s", args["missing_field"])
             return f"CLARIFICATION_NEEDED: {args['question']}"
         
         elif tool_name == "geocode_location":
             location = self._geocode_location(args["location_name"])
             if location:
-                print(f"    └─ ✅ TOOL RESULT: Found coordinates for {location['name']}", flush=True)
+                logger.debug("    └─ ✅ TOOL RESULT: Found coordinates for %s", location["name"])
                 return f"📍 **{location['name']}** is located at:\n   • Latitude: {location['lat']}\n   • Longitude: {location['lon']}"
             else:
                 schools = self._list_schools()
-                print(f"    └─ ❌ TOOL RESULT: Location not found", flush=True)
+                logger.debug("    └─ ❌ TOOL RESULT: Location not found")
                 return f"❌ Location '{args['location_name']}' not found in database.\n\n📚 Available locations:\n" + "\n".join(f"• {s}" for s in schools)
         
         return "Unknown tool"
     
+    async def _aexecute_tool(self, tool_name: str, args: Dict[str, Any]) -> str:
+        """Run :meth:`_execute_tool` on the agent's tool thread pool.
+        
+        The tool bodies are blocking psycopg2 calls; running them off the
+        event loop lets several tool calls from one LLM turn (each on its own
+        pooled connection) and other users' turns proceed concurrently. The
+        pool has max_connections threads, so extra tool calls queue for a
+        thread instead of failing with an exhausted connection pool.
+        """
+        with self._pool_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_connections,
+                                                    thread_name_prefix="agent-tool")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._execute_tool, tool_name, args)
+    
     # =========================================================================
     # MAIN AGENT LOOP
     # =========================================================================
     
-    def chat(self, user_message: str) -> str:
+    def _response_cache_key(self, model: str, messages: List[Mapping[str, Any]],
+                            serialized_tools: str) -> str:
+        """Hash model name, canonical message JSON and tool schema for the response cache."""
+        payload = model + json.dumps(messages, sort_keys=True, default=dict) + serialized_tools
+        return hashlib.sha256(payload.encode()).hexdigest()
+    
+    def _cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a cached assistant message, or None on a miss."""
+        cached = self._response_cache.get(key)
+        if cached is not None:
+            logger.debug("   └─ ⚡ Response cache hit")
+        return cached
+    
+    def _cache_put(self, key: str, message: Dict[str, Any], options: Mapping[str, Any]) -> None:
+        """Store an assistant message for RESPONSE_CACHE_TTL seconds.
+        
+        Responses sampled above CACHEABLE_MAX_TEMPERATURE are not stored:
+        replaying one would hide the variation the caller asked for.
+        """
+        if options.get("temperature", 0) > CACHEABLE_MAX_TEMPERATURE:
+            return
+        self._response_cache.set(key, message, expire=RESPONSE_CACHE_TTL)
+    
+    async def _llm_stream(self, messages: List[Mapping[str, Any]]) -> AsyncIterator[Union[str, Dict[str, Any]]]:
+        """Stream an LLM reply, serving identical prompts from the response cache.
+        
+        Temperature is kept low (LLM_OPTIONS), so replaying a cached decision
+        for the exact same message list is indistinguishable from asking again.
+        
+        Args:
+            messages: Full message list sent to the model
+            
+        Yields:
+            Text content pieces as they are generated, then the complete
+            assistant message as a plain dict ('role', 'content', 'tool_calls')
+        """
+        key = self._response_cache_key(self.model, messages, _SERIALIZED_TOOLS)
+        cached = self._cache_get(key)
+        if cached is not None:
+            # Replay exactly what a live call streams: all content, tool calls or not
+            if cached.get("content"):
+                yield cached["content"]
+            yield cached
+            return
+        
+        content_parts: List[str] = []
+        tool_calls: List[Dict[str, Any]] = []
+        stream = await self._client().chat(
+            model=self.model,
+            messages=messages,
+            tools=_STABLE_TOOLS,
+            options=dict(LLM_OPTIONS),
+            stream=True
+        )
+        async for chunk in stream:
+            piece = chunk["message"]
+            if piece.tool_calls:
+                tool_calls.extend(tc.model_dump(exclude_none=True) for tc in piece.tool_calls)
+            if piece.content:
+                content_parts.append(piece.content)
+                yield piece.content
+        
+        message: Dict[str, Any] = {"role": "assistant", "content": "".join(content_parts)}
+        if tool_calls:
+            message["tool_calls"] = tool_calls
+        self._cache_put(key, message, LLM_OPTIONS)
+        yield message
+    
+    async def _route(self, conversation: Conversation, slots: Mapping[str, float]) -> Optional[str]:
+        """Ask the router model whether this turn only needs a clarification.
+        
+        Args:
+            conversation: Conversation the turn belongs to
+            slots: Values parsed from this turn's user message
+        
+        Returns:
+            The clarification question, or None to hand the turn to the main model
+        """
+        if not self.router_model:
+            return None
+        
+        messages = [_ROUTER_MSG, *conversation.history, *self._slots_message(slots)]
+        key = self._response_cache_key(self.router_model, messages, _SERIALIZED_ROUTER_TOOLS)
+        message = self._cache_get(key)
+        if message is None:
+            try:
+                response = await self._client().chat(
+                    model=self.router_model,
+                    messages=messages,
+                    tools=_ROUTER_TOOLS,
+                    options=dict(_ROUTER_OPTIONS)
+                )
+            except ollama.ResponseError as e:
+                if e.status_code == 404:  # router model not pulled - stop trying
+                    logger.warning("⚠️  Router model %s not found, using %s for every turn",
+                                   self.router_model, self.model)
+                    self.router_model = None
+                else:
+                    logger.warning("⚠️  Router call failed, using %s for this turn: %s", self.model, e)
+                return None
+            message = response["message"].model_dump(exclude_none=True)
+            self._cache_put(key, message, _ROUTER_OPTIONS)
+        
+        for tool_call in message.get("tool_calls", []):
+            if tool_call["function"]["name"] == "ask_clarification":
+                args = tool_call["function"]["arguments"]
+                known = _CLARIFICATION_SLOTS.get(args.get("missing_field"), ())
+                if known and all(key in slots for key in known):
+                    # The user just gave this value - let the main model search
+                    logger.debug("   └─ Router: skipped clarification, %s already known", args["missing_field"])
+                    return None
+                if args.get("question"):
+                    logger.debug("   └─ Router: clarification needed (%s)", args.get("missing_field", "info"))
+                    return args["question"]
+        return None
+    
+    async def _narrate(self, messages: List[Mapping[str, Any]], assistant_message: Dict[str, Any],
+                       tool_calls: List[Dict[str, Any]], tool_results: List[str]) -> AsyncIterator[str]:
+        """Stream a short LLM summary of search results (``enable_narrative`` only).
+        
+        Yields:
+            Summary text pieces; nothing if the model answers with tool calls
+        """
+        logger.debug("📝 Narrating search results with %s...", self.model)
+        narrative_messages = [*messages, assistant_message, *(
+            {"role": "tool", "tool_name": tc["function"]["name"], "content": result}
+            for tc, result in zip(tool_calls, tool_results)
+        )]
+        async for item in self._llm_stream(narrative_messages):
+            if isinstance(item, str):
+                yield item
+    
+    def clear_response_cache(self) -> None:
+        """Drop all cached LLM responses, including those from earlier sessions."""
+        self._response_cache.clear()
+    
+    def _build_messages(self, conversation: Conversation) -> List[Mapping[str, Any]]:
+        """Build the LLM message list as stable prefix + dynamic suffix.
+        
+        The system prompt always comes first and earlier turns are only
+        rewritten by :meth:`_compact_history`, so consecutive requests share
+        the longest possible prefix and only the newest turn needs prefill on
+        the Ollama side.
+        """
+        return [_SYSTEM_MSG, *conversation.history]
+    
+    @staticmethod
+    def _truncate(message: Dict[str, Any], limit: int) -> Dict[str, Any]:
+        """Return message with its content cut to limit characters."""
+        content = message.get("content") or ""
+        if len(content) <= limit:
+            return message
+        return {**message, "content": content[:limit] + " …[truncated]"}
+    
+    async def _compact_history(self, conversation: Conversation) -> None:
+        """Fold old turns into the running summary once history grows too large.
+        
+        Keeps prefill cost bounded on long sessions. Only messages older than
+        the last HISTORY_KEEP_RECENT are summarized, and only once at least
+        HISTORY_COMPACT_MIN_CHARS of them have accumulated, so a few long
+        replies cannot trigger a summary call on every turn. New bullets are
+        appended to the existing summary rather than regenerating it, which
+        keeps its text (and the cached prompt prefix) stable. Oversized recent
+        messages are truncated. The summary is generated at temperature 0 with
+        a fixed seed so it is reproducible.
+        """
+        history = conversation.history
+        if sum(len(m.get("content") or "") for m in history) <= HISTORY_COMPACT_CHARS:
+            return
+        
+        summary = ""
+        if history and history[0]["role"] == "system" and history[0]["content"].startswith(SUMMARY_PREFIX):
+            summary = history[0]["content"][len(SUMMARY_PREFIX):]
+            history = history[1:]
+        old = history[:-HISTORY_KEEP_RECENT]
+        recent = [self._truncate(m, HISTORY_MESSAGE_MAX_CHARS) for m in history[-HISTORY_KEEP_RECENT:]]
+        
+        if sum(len(m.get("content") or "") for m in old) >= HISTORY_COMPACT_MIN_CHARS:
+            logger.debug("🗜️  Compacting %d old messages into the summary", len(old))
+            old_text = "\n".join(
+                f"{m['role']}: {self._truncate(m, HISTORY_MESSAGE_MAX_CHARS)['content']}" for m in old
+            )[-HISTORY_SUMMARY_INPUT_CHARS:]
+            try:
+                response = await self._client().chat(
+                    model=self.model,
+                    messages=[{"role": "user", "content": "Summarize in 3 bullet points:\n" + old_text}],
+                    options={"temperature": 0, "seed": 0, "num_predict": 256, "num_ctx": LLM_NUM_CTX}
+                )
+            except Exception as e:
+                logger.warning("⚠️  History compaction failed, keeping full history: %s", e)
+                return
+            blocks = [b for b in summary.split("\n\n") if b]
+            blocks.append(response["message"]["content"].strip())
+            while len(blocks) > 1 and len("\n\n".join(blocks)) > HISTORY_SUMMARY_MAX_CHARS:
+                blocks.pop(0)
+            summary = "\n\n".join(blocks)[-HISTORY_SUMMARY_MAX_CHARS:]
+        else:
+            # Too little old text to be worth a summary call - just trim
+            recent = [*old, *recent]
+        
+        head = [{"role": "system", "content": SUMMARY_PREFIX + summary}] if summary else []
+        conversation.history = [*head, *recent]
+    
+    def _event_loop(self) -> asyncio.AbstractEventLoop:
+        """Get the private event loop used by the synchronous wrappers.
+        
+        It lives as long as the agent, so the async Ollama client can keep
+        its HTTP connections alive between turns.
+        """
+        if self._loop is None or self._loop.is_closed():
+            self._loop = asyncio.new_event_loop()
+        return self._loop
+    
+    def chat(self, user_message: str, conversation: Optional[Conversation] = None) -> str:
+        """Synchronous wrapper around :meth:`achat` for programmatic callers.
+        
+        Args:
+            user_message: The user's natural language input
+            conversation: Conversation to continue (default: the agent's own)
+            
+        Returns:
+            Agent's response string
+        """
+        return self._event_loop().run_until_complete(self.achat(user_message, conversation))
+    
+    def chat_stream(self, user_message: str, conversation: Optional[Conversation] = None) -> Iterator[str]:
+        """Synchronous wrapper around :meth:`achat_stream` for the CLI.
+        
+        Args:
+            user_message: The user's natural language input
+            conversation: Conversation to continue (default: the agent's own)
+            
+        Yields:
+            Pieces of the agent's response as soon as they are available
+        """
+        loop = self._event_loop()
+        agen = self.achat_stream(user_message, conversation)
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(agen.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            loop.run_until_complete(agen.aclose())
+    
+    async def achat(self, user_message: str, conversation: Optional[Conversation] = None) -> str:
+        """Process user message and return the complete response.
+        
+        Awaiting it only blocks on network I/O, so one agent can serve many
+        conversations concurrently with ``asyncio.gather`` (see
+        :func:`achat_many`).
+        
+        Args:
+            user_message: The user's natural language input
+            conversation: Conversation to continue (default: the agent's own)
+            
+        Returns:
+            Agent's response string
+        """
+        return "".join([piece async for piece in self.achat_stream(user_message, conversation)])
+    
+    async def achat_stream(self, user_message: str,
+                           conversation: Optional[Conversation] = None) -> AsyncIterator[str]:
         """Process user message with AI reasoning and tool calling.
         
         This is the main entry point for the agent. It:
         1. Adds user message to conversation history
         2. Sends context to LLM for reasoning
         3. Executes any tool calls the LLM makes
-        4. Returns the final response
+        4. Yields the final response
+        
+        Plain text answers are yielded token by token while the model is
+        still generating; tool results are yielded as one piece.
         
         Args:
             user_message: The user's natural language input
+            conversation: Conversation to continue (default: the agent's own)
             
-        Returns:
-            Agent's response string
+        Yields:
+            Pieces of the agent's response string
         """
+        if conversation is None:
+            conversation = self.conversation
         
         # Step 1: Receive input
-        print(f"\n{'─'*60}", flush=True)
-        print(f"🔄 STEP 1: Received user input", flush=True)
-        print(f"   └─ \"{user_message}\"", flush=True)
+        logger.debug(_RULE)
+        logger.debug("🔄 STEP 1: Received user input")
+        logger.debug("   └─ %r", user_message)
         
-        # Add user message to history
-        self.conversation_history.append({"role": "user", "content": user_message})
+        # Add user message to history (compacting old turns first, if needed)
+        await self._compact_history(conversation)
+        conversation.history.append({"role": "user", "content": user_message})
+        slots = self._extract_slots(user_message)
         
         # Step 2: Build context
-        print(f"\n🧠 STEP 2: Building conversation context", flush=True)
-        print(f"   └─ History: {len(self.conversation_history)} messages", flush=True)
-        messages = [{"role": "system", "content": SYSTEM_PROMPT}] + self.conversation_history
-        
-        # Step 3: Call LLM
-        print(f"\n🤖 STEP 3: Calling Ollama ({self.model})...", flush=True)
+        logger.debug("🧠 STEP 2: Building conversation context")
+        logger.debug("   └─ History: %d messages", len(conversation.history))
+        messages = [*self._build_messages(conversation), *self._slots_message(slots)]
         
         try:
-            response = ollama.chat(
-                model=self.model,
-                messages=messages,
-                tools=TOOLS,
-                options={"temperature": 0.1}
-            )
+            # Step 3a: Let the small router model handle pure slot-filling turns
+            if self.router_model:
+                logger.debug("🧭 STEP 3a: Routing with %s...", self.router_model)
+                question = await self._route(conversation, slots)
+                if question:
+                    logger.debug(_RULE)
+                    conversation.history.append({"role": "assistant", "content": question})
+                    yield question
+                    return
+            
+            # Step 3b: Call LLM
+            logger.debug("🤖 STEP 3b: Calling Ollama (%s)...", self.model)
             
-            assistant_message = response["message"]
+            assistant_message: Dict[str, Any] = {}
+            shown = ""  # text already streamed to the user this turn
+            async for item in self._llm_stream(messages):
+                if isinstance(item, str):
+                    shown += item
+                    yield item
+                else:
+                    assistant_message = item
+            # Any preamble the model wrote before its tool calls stays visible,
+            # so tool output is separated from it and recorded together with it
+            sep = "\n\n" if shown else ""
             
             # Step 4: Analyze LLM decision
-            print(f"\n💭 STEP 4: LLM made a decision", flush=True)
+            logger.debug("💭 STEP 4: LLM made a decision")
             
             if assistant_message.get("tool_calls"):
                 tool_calls = assistant_message["tool_calls"]
-                print(f"   └─ Decision: CALL TOOL(S) - {len(tool_calls)} tool(s)", flush=True)
+                logger.debug("   └─ Decision: CALL TOOL(S) - %d tool(s)", len(tool_calls))
+                
+                # Step 5: Execute tools concurrently - DB round-trips overlap
+                if logger.isEnabledFor(logging.DEBUG):
+                    for i, tool_call in enumerate(tool_calls, 1):
+                        logger.debug("🔧 STEP 5.%d: Executing tool '%s'", i, tool_call["function"]["name"])
+                        logger.debug("   ├─ Arguments: %s", json.dumps(tool_call["function"]["arguments"]))
                 
-                tool_results = []
-                for i, tool_call in enumerate(tool_calls, 1):
-                    tool_name = tool_call["function"]["name"]
-                    tool_args = tool_call["function"]["arguments"]
-                    
-                    # Step 5: Execute tool
-                    print(f"\n🔧 STEP 5.{i}: Executing tool '{tool_name}'", flush=True)
-                    print(f"   ├─ Arguments: {json.dumps(tool_args)}", flush=True)
-                    
-                    result = self._execute_tool(tool_name, tool_args)
-                    
-                    # Handle clarification specially
+                tool_results = await asyncio.gather(*(
+                    self._aexecute_tool(
+                        tc["function"]["name"],
+                        self._fill_slots(tc["function"]["name"], tc["function"]["arguments"], slots))
+                    for tc in tool_calls
+                ))
+                
+                # Handle clarification specially
+                for tool_call, result in zip(tool_calls, tool_results):
                     if result.startswith("CLARIFICATION_NEEDED:"):
                         question = result.replace("CLARIFICATION_NEEDED: ", "")
-                        print(f"   └─ Result: Asking for clarification ({tool_args.get('missing_field', 'info')})", flush=True)
-                        print(f"{'─'*60}\n", flush=True)
-                        self.conversation_history.append({"role": "assistant", "content": question})
-                        return question
-                    
-                    print(f"   └─ Result: Success", flush=True)
-                    tool_results.append(result)
+                        tool_args = tool_call["function"]["arguments"]
+                        logger.debug("   └─ Result: Asking for clarification (%s)", tool_args.get("missing_field", "info"))
+                        logger.debug(_RULE)
+                        conversation.history.append({"role": "assistant", "content": shown + sep + question})
+                        yield sep + question
+                        return
+                
+                logger.debug("   └─ Result: Success")
+                
+                # Step 6: Format response - tool output is already user-ready, so
+                # it is returned as-is without another LLM round-trip
+                logger.debug("📤 STEP 6: Formatting final response")
+                reply = shown + sep + "\n".join(tool_results)
+                yield sep + "\n".join(tool_results)
                 
-                # Step 6: Format response
-                print(f"\n📤 STEP 6: Formatting final response", flush=True)
-                print(f"{'─'*60}\n", flush=True)
+                if self.enable_narrative and any(
+                        tc["function"]["name"] not in _DETERMINISTIC_TOOLS for tc in tool_calls):
+                    narrative = []
+                    async for piece in self._narrate(messages, assistant_message, tool_calls, tool_results):
+                        if not narrative:
+                            yield "\n"
+                        narrative.append(piece)
+                        yield piece
+                    if narrative:
+                        reply += "\n" + "".join(narrative)
+                logger.debug(_RULE)
                 
-                self.conversation_history.append({
-                    "role": "assistant", 
-                    "content": "\n".join(tool_results)
-                })
-                return "\n".join(tool_results)
+                conversation.history.append({"role": "assistant", "content": reply})
             
             else:
-                # No tool call, just text response
-                content = assistant_message.get("content", "I'm not sure how to help with that.")
-                print(f"   └─ Decision: TEXT RESPONSE (no tool needed)", flush=True)
-                print(f"\n📤 STEP 5: Returning text response", flush=True)
-                print(f"{'─'*60}\n", flush=True)
+                # No tool call, just text response (already streamed above)
+                content = assistant_message.get("content") or "I'm not sure how to help with that."
+                logger.debug("   └─ Decision: TEXT RESPONSE (no tool needed)")
+                logger.debug("📤 STEP 5: Returning text response")
+                logger.debug(_RULE)
                 
-                self.conversation_history.append({"role": "assistant", "content": content})
-                return content
+                conversation.history.append({"role": "assistant", "content": content})
+                if not shown:
+                    yield content
                 
+        except DatabaseConnectionError as e:
+            logger.error("❌ DATABASE ERROR: %s", e)
+            yield f"⚠️ Database Error: {e}. Make sure the database is running."
         except Exception as e:
-            print(f"\n❌ ERROR: {e}", flush=True)
-            print(f"{'─'*60}\n", flush=True)
-            return f"⚠️ AI Error: {e}. Make sure Ollama is running."
+            logger.error("❌ ERROR: %s", e)
+            yield f"⚠️ AI Error: {e}. Make sure Ollama is running."
+    
+    def reset(self, conversation: Optional[Conversation] = None):
+        """Clear conversation history.
+        
+        History is append-only between resets apart from compaction, which
+        starts a fresh KV-cache prefix on the next call.
+        
+        Args:
+            conversation: Conversation to clear (default: the agent's own)
+        """
+        (conversation or self.conversation).reset()
+
+
+async def achat_many(agent: AIPropertyAgent, requests: List[Tuple[Conversation, str]]) -> List[str]:
+    """Serve several independent conversations concurrently.
+    
+    All conversations share the agent's connection pool, response cache and
+    Ollama client; only their histories are separate. Ollama only overlaps
+    the requests up to its OLLAMA_NUM_PARALLEL setting; beyond that they
+    queue server-side.
     
-    def reset(self):
-        """Clear conversation history."""
-        self.conversation_history = []
+    Args:
+        agent: Agent serving every conversation
+        requests: (conversation, user_message) pairs, one per user
+        
+    Returns:
+        Responses in the same order as ``requests``
+    """
+    return list(await asyncio.gather(*(agent.achat(msg, conv) for conv, msg in requests)))
 
 
 # =============================================================================
@@ -550,20 +1259,28 @@ class AIPropertyAgent:
 
 def setup_test_data(agent: AIPropertyAgent):
     """Insert test data for Kathmandu/Jawalkhel area."""
-    cursor = agent.conn.cursor()
-    try:
+    with agent._get_conn() as conn, conn.cursor() as cursor:
         cursor.execute("DELETE FROM parcels; DELETE FROM schools;")
         
-        # Schools in Jawalkhel/Lalitpur area, Kathmandu Valley
+        # Indexes (also in init_db.sql) - radius search, KNN ordering and the
+        # trigram `%` operator rely on them
         cursor.execute("""
-            INSERT INTO schools (name, geom) VALUES
-            ('Rato Bangala School', ST_SetSRID(ST_MakePoint(85.3120, 27.6680), 4326)::geography),
-            ('St. Xavier School Jawalkhel', ST_SetSRID(ST_MakePoint(85.3140, 27.6720), 4326)::geography),
-            ('Little Angels School', ST_SetSRID(ST_MakePoint(85.3200, 27.6750), 4326)::geography),
-            ('Shuvatara School', ST_SetSRID(ST_MakePoint(85.3080, 27.6650), 4326)::geography),
-            ('Ullens School', ST_SetSRID(ST_MakePoint(85.3250, 27.6800), 4326)::geography)
+            CREATE INDEX IF NOT EXISTS idx_parcels_geom ON parcels USING GIST (geom);
+            CREATE INDEX IF NOT EXISTS idx_schools_geom ON schools USING GIST (geom);
+            CREATE INDEX IF NOT EXISTS idx_schools_name_trgm ON schools USING GIN (name gin_trgm_ops);
         """)
         
+        # Schools in Jawalkhel/Lalitpur area, Kathmandu Valley
+        schools = [
+            ("Rato Bangala School", 85.3120, 27.6680),
+            ("St. Xavier School Jawalkhel", 85.3140, 27.6720),
+            ("Little Angels School", 85.3200, 27.6750),
+            ("Shuvatara School", 85.3080, 27.6650),
+            ("Ullens School", 85.3250, 27.6800),
+        ]
+        execute_values(cursor, "INSERT INTO schools (name, geom) VALUES %s", schools,
+                       template="(%s, ST_SetSRID(ST_MakePoint(%s, %s), 4326)::geography)")
+        
         # Properties around Jawalkhel area
         parcels = [
             ("JWL001", "House No. 45, Jawalkhel Main Road, Lalitpur", 2200, "residential", 85.3130, 27.6690),
@@ -577,23 +1294,26 @@ def setup_test_data(agent: AIPropertyAgent):
             ("JWL009", "Lagankhel Apartment, Lalitpur", 950, "residential", 85.3220, 27.6680),
             ("JWL010", "Satdobato Business Center, Lalitpur", 6000, "commercial", 85.3300, 27.6550),
         ]
-        for p in parcels:
-            cursor.execute("""
-                INSERT INTO parcels (parcel_id, address, area_sqft, property_type, geom)
-                VALUES (%s, %s, %s, %s, ST_SetSRID(ST_MakePoint(%s, %s), 4326)::geography)
-            """, p)
+        execute_values(cursor, """
+            INSERT INTO parcels (parcel_id, address, area_sqft, property_type, geom) VALUES %s
+        """, parcels, template="(%s, %s, %s, %s, ST_SetSRID(ST_MakePoint(%s, %s), 4326)::geography)")
         
-        agent.conn.commit()
-        print("✅ Test data loaded (Kathmandu/Jawalkhel area)", flush=True)
-    finally:
-        cursor.close()
+    agent._invalidate_school_cache()
+    print("✅ Test data loaded (Kathmandu/Jawalkhel area)")
 
 
 def run_cli():
     """Interactive CLI."""
+    import argparse
     from dotenv import load_dotenv
     load_dotenv()
     
+    parser = argparse.ArgumentParser(description="AI Property Search Agent")
+    parser.add_argument("--debug", action="store_true",
+                        help="log the agent's reasoning steps and tool calls")
+    if parser.parse_args().debug:
+        logger.setLevel(logging.DEBUG)
+    
     db_config = {
         "host": os.getenv("DB_HOST", "localhost"),
         "port": int(os.getenv("DB_PORT", 5433)),
@@ -604,8 +1324,16 @@ def run_cli():
     
     print("\n🏠 AI Property Search Agent (Powered by Qwen2.5:7b)")
     print("=" * 50)
+    print(f"Ollama: OLLAMA_NUM_PARALLEL={os.getenv('OLLAMA_NUM_PARALLEL', 'server default')} "
+          f"(concurrent requests per model), "
+          f"OLLAMA_MAX_LOADED_MODELS={os.getenv('OLLAMA_MAX_LOADED_MODELS', 'server default')} "
+          f"(models kept in memory)")
+    print("   └─ These are read by `ollama serve`; set them there to scale concurrent users.")
+    print("   └─ The router model needs OLLAMA_MAX_LOADED_MODELS >= 2 (router + main model);"
+          " with 1, Ollama reloads a model on every turn.")
     
-    agent = AIPropertyAgent(db_config, model="qwen2.5:7b")
+    agent = AIPropertyAgent(db_config, model="qwen2.5:7b",
+                            response_cache_dir=os.getenv("AGENT_CACHE_DIR", DEFAULT_RESPONSE_CACHE_DIR))
     
     try:
         setup_test_data(agent)
@@ -622,8 +1350,10 @@ def run_cli():
                 print("🔄 Conversation reset")
                 continue
                 
-            response = agent.chat(user_input)
-            print(f"\n🤖 Agent: {response}")
+            print("\n🤖 Agent: ", end="", flush=True)
+            for chunk in agent.chat_stream(user_input):
+                print(chunk, end="", flush=True)
+            print()
             
     except KeyboardInterrupt:
         print("\nGoodbye!")
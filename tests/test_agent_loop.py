@@ -0,0 +1,88 @@
+"""Agent loop tests - Ollama and the database are stubbed, no services needed.
+
+Run with: python -m pytest -q
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+from ollama import ChatResponse, Message
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ai_agent import AIPropertyAgent, _DETERMINISTIC_TOOLS  # noqa: E402
+
+MODEL = "qwen2.5:7b"
+
+TOOL_ARGS = {
+    "list_schools": {},
+    "geocode_location": {"location_name": "Jawalkhel"},
+    "ask_clarification": {"question": "Within what radius?", "missing_field": "radius"},
+    "search_properties": {"school_name": "Rato Bangala School", "radius_miles": 2,
+                          "area_min_sqft": 1000, "area_max_sqft": 3000},
+}
+
+
+class FakeClient:
+    """Stand-in for ollama.AsyncClient that answers from a script and records calls."""
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.calls = []
+
+    async def chat(self, model, messages, tools=None, options=None, stream=False, **kwargs):
+        self.calls.append(model)
+        response = ChatResponse(model=model, message=Message(role="assistant", **self.replies.pop(0)))
+        if not stream:
+            return response
+
+        async def chunks():
+            yield response
+        return chunks()
+
+
+def tool_call(name):
+    return {"tool_calls": [Message.ToolCall(
+        function=Message.ToolCall.Function(name=name, arguments=TOOL_ARGS[name]))]}
+
+
+def make_agent(replies, enable_narrative=False):
+    agent = AIPropertyAgent({}, model=MODEL, router_model=None)
+    agent.enable_narrative = enable_narrative
+    client = FakeClient(replies)
+    agent._client = lambda: client
+    agent._execute_tool = lambda name, args: (
+        f"CLARIFICATION_NEEDED: {args['question']}" if name == "ask_clarification" else f"{name} result")
+    return agent, client
+
+
+@pytest.mark.parametrize("tool", sorted(_DETERMINISTIC_TOOLS))
+@pytest.mark.parametrize("enable_narrative", [False, True])
+def test_deterministic_tool_turn_makes_one_llm_call(tool, enable_narrative):
+    agent, client = make_agent([tool_call(tool)], enable_narrative=enable_narrative)
+
+    reply = agent.chat("hello")
+
+    assert client.calls == [MODEL]
+    expected = TOOL_ARGS[tool]["question"] if tool == "ask_clarification" else f"{tool} result"
+    assert reply == expected
+    assert agent.conversation_history[-1] == {"role": "assistant", "content": expected}
+    agent.close()
+
+
+def test_search_without_narrative_makes_one_llm_call():
+    agent, client = make_agent([tool_call("search_properties")])
+
+    assert agent.chat("Find homes near Rato Bangala") == "search_properties result"
+    assert client.calls == [MODEL]
+    agent.close()
+
+
+def test_search_with_narrative_adds_one_summary_call():
+    agent, client = make_agent([tool_call("search_properties"), {"content": "Mostly large homes."}],
+                               enable_narrative=True)
+
+    assert agent.chat("Find homes near Rato Bangala") == "search_properties result\nMostly large homes."
+    assert client.calls == [MODEL, MODEL]
+    agent.close()